@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""
+Shows what async algorithms gain when every decision waits on a service.
+
+Starts a stub decision server on localhost that answers each request after a
+fixed delay, then runs the same algorithm through the same maze asking that
+server for every move: once as a plain algorithm (one decision at a time), and
+as an async algorithm with a few max_concurrency / decision_timeout settings.
+"""
+import asyncio
+import socket
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from maze import AbsoluteDirection, Maze
+from mazerunner import MazeRunner, Runner, Direction
+
+DIRECTIONS = [AbsoluteDirection.UP, AbsoluteDirection.RIGHT,
+              AbsoluteDirection.DOWN, AbsoluteDirection.LEFT]
+
+
+def start_server(delay: float) -> int:
+  """
+  Runs the stub decision server in a background thread and returns its port.
+  It reads a line of direction names, waits delay seconds, then answers with
+  the first of them (or NONE).
+  """
+  ready = threading.Event()
+  port: List[int] = []
+
+  async def answer(reader: asyncio.StreamReader,
+                   writer: asyncio.StreamWriter) -> None:
+    request = (await reader.readline()).decode().split()
+    await asyncio.sleep(delay)
+    writer.write(((request[0] if request else 'NONE') + '\n').encode())
+    await writer.drain()
+    writer.close()
+
+  async def serve() -> None:
+    server = await asyncio.start_server(answer, '127.0.0.1', 0)
+    port.append(server.sockets[0].getsockname()[1])
+    ready.set()
+    await server.serve_forever()
+
+  threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+  ready.wait()
+  return port[0]
+
+
+def options(runner: Runner) -> List[AbsoluteDirection]:
+  """
+  Open directions the runner hasn't been in yet, cloning into all but the first.
+  Only looks at the runner's own history, so the outcome doesn't depend on
+  whether runners decide one at a time or all at once.
+  """
+  if runner.born_at() is not None and runner.age() == 0:
+    # A brand new clone just heads off the way it was cloned
+    return [runner.heading()]
+  history = runner.history()
+  position = history[-1]
+  found = [d for d in DIRECTIONS
+           if runner.can_move(d) and Maze.move(position, d) not in history]
+  for d in found[1:]:
+    runner.clone(d)
+  return found
+
+
+def ask(port: int, runner: Runner) -> Direction:
+  request = ' '.join(d.name for d in options(runner)) + '\n'
+  with socket.create_connection(('127.0.0.1', port)) as s:
+    s.sendall(request.encode())
+    return AbsoluteDirection[s.makefile().readline().strip()]
+
+
+async def ask_async(port: int, runner: Runner) -> Direction:
+  request = ' '.join(d.name for d in options(runner)) + '\n'
+  reader, writer = await asyncio.open_connection('127.0.0.1', port)
+  writer.write(request.encode())
+  answer = (await reader.readline()).decode().strip()
+  writer.close()
+  return AbsoluteDirection[answer]
+
+
+def race(label: str, algorithm, size: int, seed: int,
+         max_concurrency: Optional[int] = None,
+         decision_timeout: Optional[float] = None) -> None:
+  maze = MazeRunner(size, size, maze_seed=seed, delay_time=0,
+                    max_concurrency=max_concurrency,
+                    decision_timeout=decision_timeout)
+  start = time.time()
+  winner = maze.run_headless(algorithm)
+  elapsed = time.time() - start
+  print(f'{label:32} {"won" if winner else "lost":4} {maze.steps():4} steps'
+        f' {maze.runner_count():5} runners {elapsed:7.2f} s')
+
+
+if __name__ == '__main__':
+  size = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+  seed = int(sys.argv[2]) if len(sys.argv) > 2 else 19790122
+  delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+  port = start_server(delay)
+  print(f'{size}x{size} maze, seed {seed}, {delay * 1000:.0f} ms per decision')
+
+  race('one at a time', lambda r: ask(port, r), size, seed)
+
+  async def algorithm(runner: Runner) -> Direction:
+    return await ask_async(port, runner)
+
+  race('async, all at once', algorithm, size, seed)
+  race('async, max_concurrency=4', algorithm, size, seed, max_concurrency=4)
+  race(f'async, decision_timeout={delay / 2:g}', algorithm, size, seed,
+       decision_timeout=delay / 2)
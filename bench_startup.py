@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+"""
+Measures how long main.py takes to start, using python -X importtime.
+
+Prints the total import time, the slowest imports, and the wall time of a
+complete headless (json) run of main.py.
+"""
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times(module: str) -> List[Tuple[int, str]]:
+  """(cumulative microseconds, module) for every top level import of module"""
+  result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                           f'import {module}'],
+                          cwd=HERE, capture_output=True, text=True, check=True)
+  times: List[Tuple[int, str]] = []
+  for line in result.stderr.splitlines():
+    if not line.startswith('import time:') or 'cumulative' in line:
+      continue
+    _, cumulative, name = line[len('import time:'):].split('|')
+    # Nested imports are indented, and already counted by whoever imported them
+    if not name.startswith('  '):
+      times.append((int(cumulative), name.strip()))
+  return times
+
+
+if __name__ == '__main__':
+  times = import_times('main')
+  print(f'import main: {sum(t for t, _ in times) / 1000:.1f} ms')
+  for t, name in sorted(times, reverse=True)[:10]:
+    print(f'  {t / 1000:8.1f} ms  {name}')
+  print(f'  curses imported: {any(name == "curses" for _, name in times)}')
+
+  args = sys.argv[1:] or ['--algorithm', 'multi-me', '--output', 'json']
+  start = time.time()
+  subprocess.run([sys.executable, 'main.py'] + args, cwd=HERE,
+                 stdout=subprocess.DEVNULL, check=True)
+  print(f'main.py {" ".join(args)}: {(time.time() - start) * 1000:.1f} ms')
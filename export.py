@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Exports mazes and runs as numpy arrays and images, for analysing many runs at
+once. Needs numpy (the rest of the maze doesn't).
+"""
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+import numpy
+
+from maze import AbsoluteDirection, Maze, OPEN_SIDE
+from mazerunner import MazeRunner
+
+WALL = 0
+PASSAGE = 255
+
+
+def raster(maze: Maze) -> numpy.ndarray:
+  """
+  Draws the maze as a (2 * height + 1, 2 * width + 1) uint8 image, with one
+  pixel for every cell and one for every wall slot between (and around) them.
+  Passages are PASSAGE (white), walls are WALL (black). Cell (x, y) is pixel
+  (2 * y + 1, 2 * x + 1).
+  """
+  grid = maze.wall_grid()
+  image = numpy.full((2 * maze.height + 1, 2 * maze.width + 1), WALL,
+                     dtype=numpy.uint8)
+  image[1::2, 1::2] = PASSAGE
+  image[1::2, 2::2][grid & OPEN_SIDE[AbsoluteDirection.RIGHT] != 0] = PASSAGE
+  image[2::2, 1::2][grid & OPEN_SIDE[AbsoluteDirection.DOWN] != 0] = PASSAGE
+  # The way in and out, same as the text version of the maze
+  image[2 * maze.start.y + 1, 0] = PASSAGE
+  image[2 * maze.end.y + 1, 2 * maze.width] = PASSAGE
+  return image
+
+
+def write_pgm(path: str, image: numpy.ndarray) -> None:
+  """
+  Writes a 2d array as a binary PGM image. uint8 arrays are written as is,
+  anything else (like a heatmap of counts) as 16 bit, with the largest value
+  as white.
+  """
+  if image.dtype == numpy.uint8:
+    maxval = 255
+    data = image.tobytes()
+  else:
+    maxval = int(min(max(image.max(), 1), 65535))
+    data = numpy.clip(image, 0, maxval).astype('>u2').tobytes()
+  height, width = image.shape
+  with open(path, 'wb') as f:
+    f.write(f'P5\n{width} {height}\n{maxval}\n'.encode('ascii'))
+    f.write(data)
+
+
+def write_png(path: str, image: numpy.ndarray) -> None:
+  """Writes a 2d uint8 array as a grayscale PNG image"""
+  def chunk(kind: bytes, data: bytes) -> bytes:
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data)))
+
+  height, width = image.shape
+  # Every row starts with the filter type, 0 meaning no filtering
+  rows = numpy.zeros((height, width + 1), dtype=numpy.uint8)
+  rows[:, 1:] = image
+  with open(path, 'wb') as f:
+    f.write(b'\x89PNG\r\n\x1a\n')
+    f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0,
+                                       0)))
+    f.write(chunk(b'IDAT', zlib.compress(rows.tobytes())))
+    f.write(chunk(b'IEND', b''))
+
+
+def export_run(directory: str,
+               name: str,
+               maze_key: Any,
+               runner: MazeRunner) -> None:
+  """
+  Writes a single run to directory, where the maze key (usually the maze seed)
+  tells the mazes apart:
+    maze-KEY.png   the raster of the maze, unless it is already there
+    NAME.pgm       the heatmap of the run
+    NAME.npz       maze_key, walls (the wall_grid), heatmap and visited, for
+                   combine_runs()
+  """
+  os.makedirs(directory, exist_ok=True)
+  maze_path = os.path.join(directory, f'maze-{maze_key}.png')
+  if not os.path.exists(maze_path):
+    write_png(maze_path, raster(runner.maze))
+  heatmap = runner.heatmap()
+  write_pgm(os.path.join(directory, f'{name}.pgm'), heatmap)
+  # Written next to it first, so that being killed halfway through doesn't
+  #  leave half a run behind.
+  path = os.path.join(directory, f'{name}.npz')
+  with open(path + '.tmp', 'wb') as f:
+    numpy.savez_compressed(f,
+                           maze_key=numpy.array(maze_key),
+                           walls=runner.maze.wall_grid(),
+                           heatmap=heatmap,
+                           visited=runner.visited_grid())
+  os.replace(path + '.tmp', path)
+
+
+def combine_runs(directory: str, names: Iterable[str]) -> None:
+  """
+  Gathers the runs written by export_run() into directory/runs.npz, holding
+  names, maze_keys, walls (the wall_grid for each of maze_keys), maze (the
+  index into maze_keys and walls for each run), heatmaps and visited. Runs
+  without a file are left out. All of the mazes have to be the same size.
+  """
+  found: List[str] = []
+  mazes: Dict[Any, int] = {}
+  walls: List[numpy.ndarray] = []
+  maze_index: List[int] = []
+  heatmaps: List[numpy.ndarray] = []
+  visited: List[numpy.ndarray] = []
+  for name in names:
+    path = os.path.join(directory, f'{name}.npz')
+    if not os.path.exists(path):
+      continue
+    with numpy.load(path) as run:
+      maze_key = run['maze_key'].item()
+      if maze_key not in mazes:
+        mazes[maze_key] = len(walls)
+        walls.append(run['walls'])
+      found.append(name)
+      maze_index.append(mazes[maze_key])
+      heatmaps.append(run['heatmap'])
+      visited.append(run['visited'])
+  if not found:
+    return
+
+  numpy.savez_compressed(os.path.join(directory, 'runs.npz'),
+                         names=numpy.array(found),
+                         maze_keys=numpy.array(list(mazes)),
+                         walls=numpy.stack(walls),
+                         maze=numpy.array(maze_index),
+                         heatmaps=numpy.stack(heatmaps),
+                         visited=numpy.stack(visited))
+
+
+def export_batch(directory: str,
+                 runs: Iterable[Tuple[str, Any, MazeRunner]]) -> None:
+  """
+  Writes a whole evaluation at once. runs are (name, maze key, MazeRunner)
+  triples, each written by export_run(), and then all combined into runs.npz
+  by combine_runs().
+  """
+  names: List[str] = []
+  for name, maze_key, runner in runs:
+    export_run(directory, name, maze_key, runner)
+    names.append(name)
+  combine_runs(directory, names)
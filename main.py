@@ -1,5 +1,8 @@
 #!/usr/bin/python3
+import argparse
+import json
 import sys
+from typing import List, Optional, Tuple
 
 from maze import AbsoluteDirection
 from maze import RelativeDirection
@@ -60,48 +63,125 @@ class AlgorithmWithAPast:
     return next_move
 
 
+def choices() -> List[Tuple[str, str, Algorithm]]:
+  """The algorithms to pick from, as (flag name, description, algorithm)"""
+  return [
+      ('absolute', 'Keyboard movement (absolute)', ask_the_user),
+      ('relative', 'Keyboard movement (relative)', confuse_the_user),
+      ('repl.it', 'I know the way! (repl.it)',
+       AlgorithmWithAPast().i_know_the_way),
+      ('linux', 'I know the way! (linux)',
+       AlgorithmWithAPast().i_know_the_way_linux),
+      ('multi-me', 'Multi-me', multi_me)
+  ]
 
-if __name__ == '__main__':
-  if len(sys.argv) > 1:
-    width = int(sys.argv[1])
-    if len(sys.argv) > 2:
-      height = int(sys.argv[2])
-    else:
-      height = width
-  else:
-    width = 15
-    height = 15
 
-  if len(sys.argv) > 3:
-    maze_seed = int(sys.argv[3])
-  else:
-    maze_seed = 19790122
+# The keyboard algorithms need the curses screen to read keys from
+_INTERACTIVE = {'absolute', 'relative'}
 
-  maze = MazeRunner(width, height, delay_time=0.25, maze_seed=maze_seed)
 
-  choices = [
-      ('Keyboard movement (absolute)', ask_the_user),
-      ('Keyboard movement (relative)', confuse_the_user),
-      ('I know the way! (repl.it)', AlgorithmWithAPast().i_know_the_way),
-      ('I know the way! (linux)', AlgorithmWithAPast().i_know_the_way_linux),
-      ('Multi-me', multi_me)
-  ]
+def pick_algorithm(choice: str) -> Tuple[str, Algorithm]:
+  """Find the algorithm by its flag name or by its number in the list"""
+  algorithms = choices()
+  for num, (name, _, algorithm) in enumerate(algorithms):
+    if choice in (name, str(num)):
+      return name, algorithm
+  if len(choice) == 0:
+    return algorithms[0][0], algorithms[0][2]
+  raise ValueError(choice)
+
+
+def ask_for_algorithm() -> Tuple[str, Algorithm]:
   print("Algorithms: ")
-  for num, c in enumerate(choices):
-    print(f'  {num}: {c[0]}')
+  for num, c in enumerate(choices()):
+    print(f'  {num}: {c[1]}')
   choice: str = input('Chose a algorithm: ')
-
-  algorithm: Algorithm = lambda runner: AbsoluteDirection.NONE
   try:
-    if len(choice) == 0:
-      algo_index = 0
-    else:
-      algo_index = int(choice)
-    algorithm = choices[algo_index][1]
-  except (IndexError, ValueError):
+    return pick_algorithm(choice)
+  except ValueError:
     print(f'Invalid choice "{choice}"')
     exit(-1)
 
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+      description='Run an algorithm through a maze')
+  parser.add_argument('dimensions', nargs='*', type=int, metavar='N',
+                      help='width, height and seed (same as the flags below)')
+  parser.add_argument('--width', type=int, help='maze width (default 15)')
+  parser.add_argument('--height', type=int,
+                      help='maze height (default same as width)')
+  parser.add_argument('--seed', type=int, help='maze seed (default 19790122)')
+  parser.add_argument('--algorithm', '-a',
+                      help='algorithm name or number, instead of asking: '
+                           + ', '.join(c[0] for c in choices()))
+  parser.add_argument('--output', '-o', choices=['curses', 'json'],
+                      default='curses',
+                      help='draw the maze with curses (default), or run it '
+                           'headless and print the result as JSON')
+  parser.add_argument('--delay', type=float, default=0.25,
+                      help='seconds per step when drawing with curses')
+  parser.add_argument('--max-steps', type=int,
+                      help='give up after this many steps (json output only)')
+  args = parser.parse_args(argv)
+  if len(args.dimensions) > 3:
+    parser.error('at most width, height and seed can be given')
+  dims = args.dimensions + [None] * (3 - len(args.dimensions))
+
+  def first_given(*values):
+    return next(value for value in values if value is not None)
+
+  args.width = first_given(args.width, dims[0], 15)
+  args.height = first_given(args.height, dims[1], args.width)
+  args.seed = first_given(args.seed, dims[2], 19790122)
+  if args.width < 1 or args.height < 1:
+    parser.error('width and height have to be at least 1')
+  return args
+
+
+def run_json(maze: MazeRunner, seed: int, name: str, algorithm: Algorithm,
+             max_steps: Optional[int]) -> None:
+  """Runs the maze without curses and prints the outcome as JSON"""
+  winner = maze.run_headless(algorithm, max_steps)
+  print(json.dumps({
+      'width': maze.maze.width,
+      'height': maze.maze.height,
+      'seed': seed,
+      'algorithm': name,
+      'won': winner is not None,
+      'steps': maze.steps(),
+      'wall_time': maze.elapsed(),
+      'runners_spawned': maze.runner_count(),
+      'path': [[p.x, p.y] for p in winner.history()] if winner else None
+  }))
+
+
+if __name__ == '__main__':
+  args = parse_args(sys.argv[1:])
+
+  if args.algorithm is None:
+    if args.output == 'json':
+      print('--algorithm is required for json output')
+      exit(-1)
+    name, algorithm = ask_for_algorithm()
+  else:
+    try:
+      name, algorithm = pick_algorithm(args.algorithm)
+    except ValueError:
+      print(f'Invalid choice "{args.algorithm}"')
+      exit(-1)
+
+  if args.output == 'json':
+    if name in _INTERACTIVE:
+      print(f'"{name}" needs the keyboard, which json output does not have')
+      exit(-1)
+    maze = MazeRunner(args.width, args.height, delay_time=0,
+                      maze_seed=args.seed)
+    run_json(maze, args.seed, name, algorithm, args.max_steps)
+    exit(0)
+
+  maze = MazeRunner(args.width, args.height, delay_time=args.delay,
+                    maze_seed=args.seed)
   try:
     maze.run(algorithm)
   except KeyboardInterrupt:
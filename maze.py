@@ -1,14 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import itertools
 import random
-from dataclasses import dataclass
-from dataclasses import field
 from enum import Enum, unique, auto
 from typing import Any
 from typing import Dict, Union
 from typing import Iterable
 from typing import List
+from typing import NamedTuple
+from typing import Optional
 from typing import Set
 from typing import Tuple
 
@@ -90,10 +91,24 @@ class AbsoluteDirection(Enum):
 #  south, etc.)
 Direction = Union[RelativeDirection, AbsoluteDirection]
 
+# Numbers the mazes, see Maze.revision()
+_maze_ids = itertools.count()
 
-@dataclass(order=True, frozen=True)
-class Point:
-  """Represents a 2d position in the maze"""
+# Bits set in a cell of Maze._cells (and Maze.wall_grid()) for each side of the
+#  cell that is open (has no wall).
+OPEN_SIDE: Dict[AbsoluteDirection, int] = {
+    AbsoluteDirection.UP: 1,
+    AbsoluteDirection.RIGHT: 2,
+    AbsoluteDirection.DOWN: 4,
+    AbsoluteDirection.LEFT: 8
+}
+
+
+class Point(NamedTuple):
+  """
+  Represents a 2d position in the maze. Being a plain tuple underneath keeps
+  creating, comparing and hashing points cheap.
+  """
   x: int
   y: int
 
@@ -119,49 +134,128 @@ class Point:
     yield (Point(self.x, self.y + 1), AbsoluteDirection.DOWN)
 
   def direction(self, pt: Point) -> AbsoluteDirection:
-    # found is the direction for any adjacent points that match pt. List will
-    #  always contain 0 or 1 elements.
-    found = [x[1] for x in self.get_adjacent_points() if x[0] == pt]
-    return next(iter(found), AbsoluteDirection.NONE)
+    # Same as looking pt up in get_adjacent_points(), without creating all of
+    #  the adjacent points to do it.
+    dx = pt.x - self.x
+    dy = pt.y - self.y
+    if dy == 0:
+      if dx == -1:
+        return AbsoluteDirection.LEFT
+      if dx == 1:
+        return AbsoluteDirection.RIGHT
+    elif dx == 0:
+      if dy == -1:
+        return AbsoluteDirection.UP
+      if dy == 1:
+        return AbsoluteDirection.DOWN
+    return AbsoluteDirection.NONE
 
 
 class Maze(object):
-  """Represents a two dimensional maze"""
+  """
+  Represents a two dimensional maze
+
+  Internally every cell is known by its cell id (y * width + x). Points are
+  only handed out at the edges, and always the same Point object for the same
+  cell.
+  """
   width: int
   height: int
   start: Point
+  end: Point
   _random: Any
+  # One byte per cell id, made up of the OPEN_SIDE bits of the sides without a
+  #  wall
+  _cells: bytearray
+  # The Point for every cell id, made the first time it is asked for
+  _points: List[Optional[Point]]
+  # What str() returns, and the lines it is made of. Kept up to date as walls
+  #  are opened and closed.
+  _lines: Optional[List[str]] = None
+  _text: Optional[str] = None
+  _id: int
+  # Goes up every time a wall is knocked down or put back up
+  _version: int = 0
 
   def __init__(self, width=20, height=10, generator=random):
     """
     Creates a new maze with the given sizes, with all walls standing.
     """
     self._random = generator
+    self._id = next(_maze_ids)
     self.width = width
     self.height = height
-    self.start = Point(0, self._random.randrange(0, height))
-    self.end = Point(width - 1, self._random.randrange(0, height))
+    self._cells = bytearray(width * height)
+    self._points = [None] * (width * height)
+    self.start = self.point(self._random.randrange(0, height) * width)
+    self.end = self.point(self._random.randrange(0, height) * width + width - 1)
     self._create_maze()
 
+  def revision(self) -> Tuple[int, int]:
+    """
+    Tells this maze, with its walls as they are now, apart from any other. A
+    pickled copy has the same revision as the maze it was made from, until
+    either of them has a wall opened or closed.
+    """
+    return self._id, self._version
+
+  def cell_id(self, position: Point) -> int:
+    return position.y * self.width + position.x
+
+  def point(self, cell_id: int) -> Point:
+    point = self._points[cell_id]
+    if point is None:
+      point = Point(cell_id % self.width, cell_id // self.width)
+      self._points[cell_id] = point
+    return point
+
+  def contains(self, position: Point) -> bool:
+    return 0 <= position.x < self.width and 0 <= position.y < self.height
+
+  def wall_grid(self):
+    """
+    The cells as a (height, width) numpy array of uint8, without copying them.
+    Each cell holds a bit for every side that is open (has no wall): 1 up, 2
+    right, 4 down and 8 left. The array is read only, and follows along when
+    walls are opened or closed. Needs numpy.
+    """
+    import numpy
+    grid = numpy.frombuffer(self._cells, dtype=numpy.uint8)
+    grid = grid.reshape(self.height, self.width)
+    grid.flags.writeable = False
+    return grid
+
   @staticmethod
   def char_position(position: Point) -> Point:
     return Point(position.x * 4 + 2, position.y * 2 + 1)
 
   def can_move(self, position: Point, direction: AbsoluteDirection):
-    target = self.move(position, direction)
-    return self._cells[position].connected_to(target)
+    return (self.contains(position)
+            and self.can_step(self.cell_id(position), direction))
+
+  def can_step(self, cell_id: int, direction: AbsoluteDirection) -> bool:
+    """Cell id version of can_move()"""
+    return bool(self._cells[cell_id] & OPEN_SIDE.get(direction, 0))
+
+  def step(self, cell_id: int, direction: AbsoluteDirection) -> int:
+    """Cell id version of move(). Returns -1 when stepping out of the maze."""
+    if direction == AbsoluteDirection.NONE:
+      return cell_id
+    elif direction == AbsoluteDirection.UP:
+      return cell_id - self.width if cell_id >= self.width else -1
+    elif direction == AbsoluteDirection.DOWN:
+      below = cell_id + self.width
+      return below if below < len(self._cells) else -1
+    elif direction == AbsoluteDirection.LEFT:
+      return cell_id - 1 if cell_id % self.width else -1
+    elif direction == AbsoluteDirection.RIGHT:
+      return cell_id + 1 if (cell_id + 1) % self.width else -1
+
+    raise Exception(f"Unexpected direction {direction}")
 
   @staticmethod
   def heading(start: Point, end: Point) -> AbsoluteDirection:
-    if start.above() == end:
-      return AbsoluteDirection.UP
-    elif start.below() == end:
-      return AbsoluteDirection.DOWN
-    elif start.left() == end:
-      return AbsoluteDirection.LEFT
-    elif start.right() == end:
-      return AbsoluteDirection.RIGHT
-    return AbsoluteDirection.NONE
+    return start.direction(end)
 
   @staticmethod
   def move(position: Point, direction: AbsoluteDirection):
@@ -178,47 +272,118 @@ class Maze(object):
 
     raise Exception(f"Unexpected direction {direction}")
 
-  @dataclass
-  class _Cell:
-    """Represents a cell in the maze"""
-    _position: Point
-    _connections: Set[Point] = field(default_factory=set)
-
-    def connect(self, connect_to):
-      self._connections.add(connect_to)
-
-    def wall_above(self):
-      return self._position.above() not in self._connections
-
-    def wall_below(self):
-      return self._position.below() not in self._connections
-
-    def wall_left(self):
-      return self._position.left() not in self._connections
-
-    def wall_right(self):
-      return self._position.right() not in self._connections
-
-    def connected(self) -> bool:
-      if self._connections:
-        return True
-      else:
-        return False
-
-    def connected_to(self, target: Point):
-      return target in self._connections
-
-  class _Cells(dict):
+  def _connect(self, cell_id: int, direction: AbsoluteDirection):
+    """Knocks down the wall on the given side of the cell"""
+    self._version += 1
+    self._cells[cell_id] |= OPEN_SIDE[direction]
+    self._cells[self.step(cell_id, direction)] |= OPEN_SIDE[
+        direction.absolute(RelativeDirection.BACKWARD)]
+
+  def _disconnect(self, cell_id: int, direction: AbsoluteDirection):
+    """Puts the wall on the given side of the cell back up"""
+    self._version += 1
+    self._cells[cell_id] &= ~OPEN_SIDE[direction]
+    self._cells[self.step(cell_id, direction)] &= ~OPEN_SIDE[
+        direction.absolute(RelativeDirection.BACKWARD)]
+
+  def _wall_cell(self,
+                 position: Point,
+                 direction: AbsoluteDirection) -> Tuple[int, int]:
     """
-    Custom dictionary that will automatically create a new cell at the given
-    position with no connections
+    Returns the cell ids on either side of the wall, or raises if it is one of
+    the walls around the outside of the maze.
     """
-    def __missing__(self, key):
-      c = Maze._Cell(key)
-      self[key] = c
-      return c
-
-  _cells: Dict[Point, _Cell] = _Cells()
+    if direction == AbsoluteDirection.NONE or not self.contains(position):
+      raise Exception(f'No wall {direction} of {position}')
+    cell_id = self.cell_id(position)
+    other = self.step(cell_id, direction)
+    if other < 0:
+      raise Exception(f'Not allowed to change the outside wall {direction} of'
+                      f' {position}')
+    return cell_id, other
+
+  def open_wall(self, position: Point, direction: AbsoluteDirection) -> None:
+    """
+    Knocks down the wall on the given side of position. Opening a wall can't
+    cut anything off, so nothing else has to change.
+    """
+    cell_id, _ = self._wall_cell(position, direction)
+    self._connect(cell_id, direction)
+    self._redraw_wall(cell_id, direction)
+
+  def close_wall(self,
+                 position: Point,
+                 direction: AbsoluteDirection
+                 ) -> Optional[Tuple[Point, AbsoluteDirection]]:
+    """
+    Puts the wall on the given side of position back up. If that cuts part of
+    the maze off from the rest, a random wall between the two parts is knocked
+    down to keep every cell reachable. That wall is returned (as a position and
+    direction), or None if no other wall had to be opened. If the closed wall is
+    the only thing holding the parts together it stays open, and is returned.
+
+    Only the smaller side of the wall is searched to find out, so the work
+    depends on how much of the maze could be cut off, not on the maze's size.
+    """
+    cell_id, other = self._wall_cell(position, direction)
+    if not self.can_step(cell_id, direction):
+      return None
+    self._disconnect(cell_id, direction)
+    self._redraw_wall(cell_id, direction)
+
+    cut_off = self._cut_off(cell_id, other)
+    if cut_off is None:
+      return None
+
+    # Every wall from the cut off part into the rest of the maze could join them
+    #  back together, including the one that was just closed.
+    candidates: List[Tuple[int, AbsoluteDirection]] = []
+    for c in cut_off:
+      for d in OPEN_SIDE:
+        neighbour = self.step(c, d)
+        if neighbour >= 0 and neighbour not in cut_off:
+          candidates.append((c, d))
+    repair_cell, repair_direction = self._random.choice(candidates)
+    self._connect(repair_cell, repair_direction)
+    self._redraw_wall(repair_cell, repair_direction)
+    return self.point(repair_cell), repair_direction
+
+  def _cut_off(self, a: int, b: int) -> Optional[Set[int]]:
+    """
+    Searches outwards from the cells a and b at the same pace. If they meet,
+    they are still connected and None is returned. Otherwise returns all cells
+    on the side that ran out of cells to search first.
+    """
+    seen = ({a}, {b})
+    todo = ([a], [b])
+    while True:
+      for side in (0, 1):
+        if not todo[side]:
+          return seen[side]
+        cell = todo[side].pop()
+        for d in OPEN_SIDE:
+          if not self.can_step(cell, d):
+            continue
+          neighbour = self.step(cell, d)
+          if neighbour in seen[1 - side]:
+            return None
+          if neighbour not in seen[side]:
+            seen[side].add(neighbour)
+            todo[side].append(neighbour)
+
+  def _redraw_wall(self, cell_id: int, direction: AbsoluteDirection) -> None:
+    """Redraws the rows of text showing the wall on this side of the cell"""
+    y = self.point(cell_id).y
+    if direction == AbsoluteDirection.DOWN:
+      y += 1
+    if direction in (AbsoluteDirection.UP, AbsoluteDirection.DOWN):
+      # The wall is drawn in the line above row y, along with its corners
+      self._redraw_row(y)
+    else:
+      # The wall is drawn in row y, and its ends in the corners above and
+      #  below it
+      self._redraw_row(y)
+      self._redraw_row(y + 1)
 
   def _create_maze(self):
     """
@@ -255,40 +420,83 @@ class Maze(object):
         └───┴───┴───┘
     """
 
-    def get_adjacent_points(pt: Point) -> Iterable[Point]:
-      """Return valid adjacent points that are NOT part of the maze"""
-      if pt.x > 0:
-        yield Point(pt.x - 1, pt.y)
-      if pt.x + 1 < self.width:
-        yield Point(pt.x + 1, pt.y)
-      if pt.y > 0:
-        yield Point(pt.x, pt.y - 1)
-      if pt.y + 1 < self.height:
-        yield Point(pt.x, pt.y + 1)
-
-    # Initialize the cells to a default dict, which will ensure that all
-    # requested cells will be initialized to having no connections (has 4 walls)
-    # and add the start cell to the dictionary
-    adj_cells: Set[Point]
-    adj_cells = set(get_adjacent_points(self.start))
+    cells = self._cells
+    width = self.width
+    height = self.height
+
+    def get_adjacent_cells(x: int, y: int) -> Iterable[Tuple[int, int]]:
+      """Return valid adjacent (x, y) cells"""
+      if x > 0:
+        yield (x - 1, y)
+      if x + 1 < width:
+        yield (x + 1, y)
+      if y > 0:
+        yield (x, y - 1)
+      if y + 1 < height:
+        yield (x, y + 1)
+
+    # The neighbour's offset from a cell, to the direction of that neighbour
+    directions = {(-1, 0): AbsoluteDirection.LEFT,
+                  (1, 0): AbsoluteDirection.RIGHT,
+                  (0, -1): AbsoluteDirection.UP,
+                  (0, 1): AbsoluteDirection.DOWN}
+
+    # All cells start out with no connections (has 4 walls). The sets below
+    # hold (x, y) tuples rather than cell ids on purpose: their iteration order
+    # feeds the random choices, and has to stay the same for a seed to keep
+    # giving the same maze. The tuples hash like the Points they stand for, and
+    # only live while their cell is on the frontier.
+    start = (self.start.x, self.start.y)
+    adj_cells: Set[Tuple[int, int]]
+    adj_cells = set(get_adjacent_cells(*start))
 
     while len(adj_cells) > 0:
       # Pick a random cell from the remaining adjacencies
       cell = self._random.sample(adj_cells, 1)[0]
       adj_cells.remove(cell)
+      x, y = cell
 
       # Chose a random wall that connects to the maze, and remove it
-      adj = set(get_adjacent_points(cell))
-      connections = [p for p in adj if (p == self.start or
-                                        self._cells[p].connected())]
+      adj = set(get_adjacent_cells(x, y))
+      connections = [p for p in adj if (p == start or
+                                        cells[p[1] * width + p[0]])]
       connect_to = self._random.choice(connections)
-      self._cells[cell].connect(connect_to)
-      self._cells[connect_to].connect(cell)
+      self._connect(y * width + x,
+                    directions[connect_to[0] - x, connect_to[1] - y])
 
-      # Add all of the adjacent points to this new cell that aren't in the maze
-      non_connections = {p for p in adj if not self._cells[p].connected()}
+      # Add all of the adjacent cells to this new cell that aren't in the maze
+      non_connections = {p for p in adj if not cells[p[1] * width + p[0]]}
       adj_cells |= non_connections
 
+  def __getstate__(self):
+    # Only the walls are worth sending along (to worker processes, say). The
+    #  Points and the text are made again when needed, and the generator is
+    #  only needed to generate.
+    state = self.__dict__.copy()
+    for rebuilt in ('_points', '_lines', '_text', '_random'):
+      state.pop(rebuilt, None)
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._random = random
+    self._points = [None] * (self.width * self.height)
+    self._points[self.cell_id(self.start)] = self.start
+    self._points[self.cell_id(self.end)] = self.end
+
+  # For different draw styles:
+  #  https://en.wikipedia.org/wiki/Box-drawing_character
+  #  http://www.fileformat.info/info/unicode/block/box_drawing/list.htm
+  _DRAW: Dict[str, str] = {
+      'SENW': '┼',
+      'SEN': '├', 'ENW': '┴', 'SNW': '┤', 'SEW': '┬',
+      'EN': '└', 'NW': '┘', 'SE': '┌', 'SW': '┐',
+      'SN': '│', 'N': '╵', 'S': '╷',
+      'EW': '─', 'W': '╴', 'E': '╶',
+      # Only once walls have been opened after the maze was made
+      '': ' '
+  }
+
   def __str__(self):
     """
     This will print the text representation of a single cell.
@@ -304,65 +512,77 @@ class Maze(object):
         ├───┼───┼───┤
       2 │   │   │   │
         └───┴───┴───┘
-    """
-    # For different draw styles:
-    #  https://en.wikipedia.org/wiki/Box-drawing_character
-    #  http://www.fileformat.info/info/unicode/block/box_drawing/list.htm
-    d = {
-        'SENW': '┼',
-        'SEN': '├', 'ENW': '┴', 'SNW': '┤', 'SEW': '┬',
-        'EN': '└', 'NW': '┘', 'SE': '┌', 'SW': '┐',
-        'SN': '│', 'N': '╵', 'S': '╷',
-        'EW': '─', 'W': '╴', 'E': '╶'
-    }
 
-    def get_corner(corner_pt: Point) -> str:
-      corner_cell = self._cells[corner_pt]
-      corner_description: str = ""
-      if corner_cell.wall_left():
-        corner_description += 'S'
-      if corner_cell.wall_above():
-        corner_description += 'E'
-      try:
-        if self._cells.get(Point(corner_pt.x, corner_pt.y - 1)).wall_left():
-          corner_description += 'N'
-      except AttributeError:
-        pass
-      try:
-        if self._cells.get(Point(corner_pt.x - 1, corner_pt.y)).wall_above():
-          corner_description += 'W'
-      except AttributeError:
-        pass
-      return d.get(corner_description, '⚠')
-
-    lines: List[str] = []
-    for y in range(0, self.height):
-      line1: str = ''
-      line2: str = ''
-      for x in range(0, self.width):
-        p = Point(x, y)
-        cell = self._cells[p]
-        line1 += get_corner(p) + (d['EW'] * 3 if cell.wall_above() else '   ')
-        line2 += d['SN'] + '   ' if (cell.wall_left()
-                                     and not p == self.start) else '    '
-      if y == 0:
-        line1 += d['SW']
-      elif self._cells[Point(self.width - 1, y)].wall_above():
-        line1 += d['SNW']
-      else:
-        line1 += d['SN']
-      line2 += d['SN'] if y != self.end.y else ' '
-      lines.append(line1)
-      lines.append(line2)
+    The text is kept around, and open_wall()/close_wall() only redraw the rows
+    around the wall they changed.
+    """
+    if self._text is None:
+      if self._lines is None:
+        self._lines = []
+        for y in range(0, self.height):
+          self._lines.extend(self._draw_row(y))
+        self._lines.append(self._draw_bottom())
+      self._text = '\n'.join(self._lines)
+    return self._text
+
+  def _wall_above(self, x: int, y: int) -> bool:
+    open_side = OPEN_SIDE[AbsoluteDirection.UP]
+    return not self._cells[y * self.width + x] & open_side
+
+  def _wall_left(self, x: int, y: int) -> bool:
+    open_side = OPEN_SIDE[AbsoluteDirection.LEFT]
+    return not self._cells[y * self.width + x] & open_side
+
+  def _draw_corner(self, x: int, y: int) -> str:
+    corner_description: str = ""
+    if self._wall_left(x, y):
+      corner_description += 'S'
+    if self._wall_above(x, y):
+      corner_description += 'E'
+    if y > 0 and self._wall_left(x, y - 1):
+      corner_description += 'N'
+    if x > 0 and self._wall_above(x - 1, y):
+      corner_description += 'W'
+    return self._DRAW.get(corner_description, '⚠')
+
+  def _draw_row(self, y: int) -> Tuple[str, str]:
+    """The two lines of text for a row: the walls above it, and the cells"""
+    d = self._DRAW
+    line1: str = ''
+    line2: str = ''
+    for x in range(0, self.width):
+      line1 += (self._draw_corner(x, y)
+                + (d['EW'] * 3 if self._wall_above(x, y) else '   '))
+      line2 += d['SN'] + '   ' if (self._wall_left(x, y)
+                                   and not (x == self.start.x
+                                            and y == self.start.y)
+                                   ) else '    '
+    if y == 0:
+      line1 += d['SW']
+    elif self._wall_above(self.width - 1, y):
+      line1 += d['SNW']
+    else:
+      line1 += d['SN']
+    line2 += d['SN'] if y != self.end.y else ' '
+    return line1, line2
 
+  def _draw_bottom(self) -> str:
     # The bottom line has to look at the bottom row to decide if there is a wall
     #  going up to connect.
+    d = self._DRAW
     bottom = d['EN'] + d['EW'] * 3
     for x in range(1, self.width):
-      p = Point(x, self.height - 1)
-      bottom += ((d['ENW'] if self._cells[p].wall_left() else d['EW'])
+      bottom += ((d['ENW'] if self._wall_left(x, self.height - 1) else d['EW'])
                  + (d['EW'] * 3))
     bottom += d['NW']
-
-    lines.append(bottom)
-    return '\n'.join(lines)
+    return bottom
+
+  def _redraw_row(self, y: int) -> None:
+    """Redraws a row of the kept text (the bottom line for y == height)"""
+    if self._lines is None:
+      return
+    if y == self.height:
+      self._lines[2 * y] = self._draw_bottom()
+    else:
+      self._lines[2 * y], self._lines[2 * y + 1] = self._draw_row(y)
+    self._text = None
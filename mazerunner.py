@@ -1,14 +1,31 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import curses
+import inspect
+import os
 import random
 import time
-from itertools import tee
-from typing import Callable, List
+from array import array
+from itertools import repeat, tee
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from typing import Union
+from typing import TYPE_CHECKING
 
 from maze import Direction, AbsoluteDirection, RelativeDirection, Maze, Point
 
+if TYPE_CHECKING:
+  import asyncio
+  from concurrent.futures import Executor
+
+
+def _curses():
+  """
+  curses is imported here, the first time something is drawn or read from the
+  keyboard, so that running without a screen never loads it.
+  """
+  import curses
+  return curses
+
 
 class Runner:
   def can_move(self, direction: Direction) -> bool:
@@ -42,7 +59,9 @@ class Runner:
   def clone(self, direction: Direction, name: str = None) -> None:
     """
     Make a clone of yourself, pointing in the given direction. Will set the
-    born at position.
+    born at position. The clone steps into the maze once you have decided on
+    your move, standing where you stand now, and takes its first step right
+    after everyone else has taken theirs.
 
     Note: if you attempt to clone your self to have more copies of you than
     there are in the maze, a black hole is formed and sucks the maze into a
@@ -84,51 +103,428 @@ class Runner:
     """
     pass
 
+  def visited(self, direction: Direction) -> bool:
+    """
+    Returns True if any runner (you, your clones, or even the dearly departed)
+    has ever stood in the cell in the given direction. Cells outside of the maze
+    have never been visited.
+    """
+    pass
+
+  def visit_count(self) -> int:
+    """Returns how many distinct cells have been visited by all runners"""
+    pass
+
 
 # This is the type needed when creating a new runner. The Algorithm must be
 #  given when calling the MazeRunner.run method, as it determines what path will
 #  be taken. If you return a direction that results in walking into one of the
 #  electrified walls the Runner will be vaporized and will no longer exist in
 #  the maze.
-Algorithm = Callable[[Runner], Direction]
+#
+# Normally each runner decides and then moves before the next runner decides,
+#  so every decision sees the moves made before it.
+#
+# The Algorithm may also be an ``async def`` function, for when deciding has to
+#  wait on something outside of the maze (a decision service, for instance).
+#  Anything else that returns an awaitable, like an object with an async
+#  __call__ or a lambda calling an async def function, works too. All runners'
+#  decisions for a step are then awaited concurrently, and a decision that
+#  takes longer than the decision timeout counts as NONE, which is to say the
+#  runner is vaporized. Since everyone decides before anyone moves, shared
+#  state (visited(), visit_count()) is as it was at the start of the round:
+#  runners don't see the moves the others are about to make.
+Algorithm = Union[Callable[[Runner], Direction],
+                  Callable[[Runner], Awaitable[Direction]]]
 
 
 class MazeRunner:
-  """Curses based console maze runner"""
-  maze: Maze
+  """
+  Curses based console maze runner
+
+  curses is only imported once the maze is actually drawn, and asyncio once an
+  async algorithm or run_headless_async() needs it, so scripts using
+  run_headless() don't pay for either.
+  """
+  _maze: Optional[Maze]
+  _width: int
+  _height: int
+  _maze_seed: Any
   _delay_time: float
-  _runners: List[_RunnerImpl] = []
-  _crashed: List[_RunnerImpl] = []
+  _max_concurrency: Optional[int]
+  _decision_timeout: Optional[float]
+  _executor: Optional[Executor]
+  _loop: Optional[asyncio.AbstractEventLoop] = None
+  # An algorithm found to return awaitables, without being an async def
+  #  function
+  _awaited_algorithm: Optional[Algorithm] = None
+  # One byte per cell (indexed by cell id), set once any runner has been
+  #  there. Shared by all runners so lookups don't have to walk every history.
+  _visited: bytearray
+  _visit_count: int = 0
+  _runners: List[_RunnerImpl]
+  _crashed: List[_RunnerImpl]
+  _steps: int = 0
+  _elapsed: float = 0
+  # Numbers the clones that weren't given a name. Kept per MazeRunner so names
+  #  don't depend on what other mazes in the same process are up to.
+  _clone_num: int = 0
 
   def __init__(self,
                width,
                height,
                maze_seed=None,
-               delay_time=0.1):
+               delay_time=0.1,
+               max_concurrency=None,
+               decision_timeout=None,
+               executor=None,
+               maze=None):
+    """
+    max_concurrency and decision_timeout only apply to async algorithms. They
+    limit how many decisions may be awaited at once, and how many seconds a
+    single decision may take before the runner is treated as having crashed.
+    Async decisions are all made before any runner moves (see Algorithm).
+
+    executor is an optional concurrent.futures.Executor used to ask a (non
+    async) algorithm about all runners of a step in parallel. Moves are still
+    made in runner order, but everyone decides before anyone moves, so the
+    outcome is only the same as without it for algorithms that don't look at
+    shared state (visited(), visit_count(), where the other runners are). With
+    a process pool the algorithm has to be picklable, and any state it keeps
+    for itself stays behind in the worker processes. Each worker process is
+    only sent the maze once (and again after a wall changes), after that just
+    the runners and the visited cells go back and forth.
+
+    maze is an already generated Maze to run in instead of creating one (width,
+    height and maze_seed are then ignored). It is only ever read from, so many
+    MazeRunners can share the same one. Otherwise the maze is created the first
+    time it is needed.
+    """
     self._delay_time = delay_time
-    print("Creating the Maze ({w}x{h} seed={s})".format(w=width,
-                                                        h=height,
-                                                        s=maze_seed))
-    time.sleep(1)
-    r = random.Random()
-    r.seed(maze_seed, version=1)
-    self.maze = Maze(width, height, r)
+    self._max_concurrency = max_concurrency
+    self._decision_timeout = decision_timeout
+    self._executor = executor
+    self._runners = []
+    self._crashed = []
+    self._maze = maze
+    self._width = maze.width if maze else width
+    self._height = maze.height if maze else height
+    self._maze_seed = maze_seed
+    self._visited = bytearray(self._width * self._height)
+
+  @property
+  def maze(self) -> Maze:
+    if self._maze is None:
+      r = random.Random()
+      r.seed(self._maze_seed, version=1)
+      self._maze = Maze(self._width, self._height, r)
+    return self._maze
+
+  def mark_visited(self, cell_id: int) -> None:
+    if not self._visited[cell_id]:
+      self._visited[cell_id] = 1
+      self._visit_count += 1
+
+  def cell_visited(self, cell_id: int) -> bool:
+    return cell_id >= 0 and self._visited[cell_id] == 1
+
+  def is_visited(self, position: Point) -> bool:
+    return (self.maze.contains(position)
+            and self.cell_visited(self.maze.cell_id(position)))
+
+  def visit_count(self) -> int:
+    return self._visit_count
+
+  def visited_grid(self):
+    """
+    The visited cells as a (height, width) numpy array of uint8 (1 for
+    visited), without copying them. The array is read only. Needs numpy.
+    """
+    import numpy
+    grid = numpy.frombuffer(self._visited, dtype=numpy.uint8)
+    grid = grid.reshape(self.maze.height, self.maze.width)
+    grid.flags.writeable = False
+    return grid
+
+  def heatmap(self):
+    """
+    How many times a runner stood in each cell, as a (height, width) numpy
+    array of counts. Clones only count from where they were born, so the path
+    they share with whoever cloned them isn't counted twice. Needs numpy.
+    """
+    import numpy
+    cells = []
+    for runner in self._runners + self._crashed:
+      history = numpy.frombuffer(runner._history,
+                                 dtype=runner._history.typecode)
+      cells.append(history[runner._born_at_index or 0:])
+      cells.append(numpy.array([runner._cell], dtype=history.dtype))
+    counts = numpy.bincount(numpy.concatenate(cells) if cells else [],
+                            minlength=self.maze.width * self.maze.height)
+    return counts.reshape(self.maze.height, self.maze.width)
+
+  def steps(self) -> int:
+    """How many steps have been taken by run_headless() so far"""
+    return self._steps
+
+  def elapsed(self) -> float:
+    """
+    Seconds run_headless() has spent stepping. run_headless_async() doesn't
+    count the turns it gives other tasks between steps, but does count the time
+    spent awaiting an async algorithm's decisions, which other tasks on the same
+    loop may have used.
+    """
+    return self._elapsed
+
+  def runner_count(self) -> int:
+    """How many runners have ever been in the maze, crashed or not"""
+    return len(self._runners) + len(self._crashed)
+
+  def next_clone_name(self) -> str:
+    self._clone_num += 1
+    return f'Runner{self._clone_num:04d}'
 
   def clone_runner(self,
                    runner: _RunnerImpl,
                    direction: Direction,
-                   name: str):
+                   name: str) -> _RunnerImpl:
     if len(self._runners) > self.maze.height * self.maze.width:
       raise Exception(f"Not allowed to have more runners ({len(self._runners)})"
                       f" than cells in the maze"
                       f" ({self.maze.height * self.maze.width})!")
-    self._runners.append(runner.duplicate(direction, name))
+    clone = runner.duplicate(direction, name)
+    self._runners.append(clone)
+    return clone
 
   def run(self, algorithm: Algorithm):
     """Run the maze. Returns true if it was solved"""
-    curses.wrapper(lambda stdscr: self._run(stdscr, algorithm))
+    curses = _curses()
+    if self._maze is None:
+      print("Creating the Maze ({w}x{h} seed={s})".format(w=self._width,
+                                                          h=self._height,
+                                                          s=self._maze_seed))
+      time.sleep(1)
+    try:
+      curses.wrapper(lambda stdscr: self._run(stdscr, algorithm))
+    finally:
+      if self._loop is not None:
+        self._loop.close()
+        self._loop = None
+
+  def run_headless(self,
+                   algorithm: Algorithm,
+                   max_steps: int = None) -> Optional[Runner]:
+    """
+    Runs the maze without drawing anything, as fast as it goes. Returns the
+    runner that reached the end, or None if every runner crashed or max_steps
+    ran out first.
+    """
+    self._runners.append(_RunnerImpl(self, self.maze.start, None))
+    try:
+      while self._runners and (max_steps is None or self._steps < max_steps):
+        self._steps += 1
+        start_time = time.time()
+        winner = self._step(algorithm)
+        self._elapsed += time.time() - start_time
+        if winner:
+          return winner
+      return None
+    finally:
+      if self._loop is not None:
+        self._loop.close()
+        self._loop = None
+
+  async def run_headless_async(self,
+                               algorithm: Algorithm,
+                               max_steps: int = None) -> Optional[Runner]:
+    """
+    Same as run_headless(), but runs on the current event loop and gives other
+    tasks a turn between steps.
+    """
+    import asyncio
+    self._runners.append(_RunnerImpl(self, self.maze.start, None))
+    while self._runners and (max_steps is None or self._steps < max_steps):
+      self._steps += 1
+      start_time = time.time()
+      winner = await self._step_async(algorithm)
+      self._elapsed += time.time() - start_time
+      if winner:
+        return winner
+      await asyncio.sleep(0)
+    return None
+
+  async def _step_async(self, algorithm: Algorithm) -> Optional[_RunnerImpl]:
+    """Same as _step(), for when there already is a running event loop"""
+    winner, batch = self._start_step(algorithm)
+    while batch and not winner:
+      if self._awaits(algorithm):
+        directions = await self._decide_async(algorithm, batch)
+      else:
+        directions = self._decide(algorithm, batch)
+      winner, batch = self._apply(batch, directions)
+    return winner
 
-  def _run(self, screen, algorithm: Callable[[Runner], Direction]):
+  def _step(self, algorithm: Algorithm) -> Optional[_RunnerImpl]:
+    """
+    Advances every runner by one move. Runners cloned during the step take their
+    first move in the same step, after the runners that cloned them. Returns the
+    runner that reached the end, if any.
+    """
+    winner, batch = self._start_step(algorithm)
+    # The rest of the step is decided a round at a time: everyone in the round
+    #  decides first, then they all move in order.
+    while batch and not winner:
+      winner, batch = self._apply(batch, self._decide(algorithm, batch))
+    return winner
+
+  def _awaits(self, algorithm: Algorithm) -> bool:
+    """Whether the algorithm's decisions have to be awaited"""
+    call = getattr(algorithm, '__call__', None)
+    return (algorithm is self._awaited_algorithm
+            or inspect.iscoroutinefunction(algorithm)
+            or inspect.iscoroutinefunction(call))
+
+  def _start_step(self, algorithm: Algorithm
+                  ) -> Tuple[Optional[_RunnerImpl], List[_RunnerImpl]]:
+    """
+    Moves the runners one at a time, if the algorithm allows for that. Returns
+    the winner (if any) and the runners still to be decided a round at a time.
+    """
+    if self._executor is None and not self._awaits(algorithm):
+      return self._step_one_by_one(algorithm)
+    return None, list(self._runners)
+
+  def _step_one_by_one(self, algorithm: Algorithm
+                       ) -> Tuple[Optional[_RunnerImpl], List[_RunnerImpl]]:
+    i: int = 0
+    while i < len(self._runners):
+      # Since the algorithm can ask a runner to duplicate itself, we need
+      # to iterate until we hit the end of the list, even if the size of
+      # the list is growing during the iteration.
+      runner = self._runners[i]
+
+      direction = algorithm(runner)
+      if inspect.isawaitable(direction):
+        # Not an async def function, but it returns something to await all
+        #  the same (a lambda calling one, say). The coroutine hasn't started
+        #  yet, so it is dropped, and the runners left are asked again as an
+        #  async algorithm, which it is from now on.
+        if inspect.iscoroutine(direction):
+          direction.close()
+        self._awaited_algorithm = algorithm
+        return None, self._runners[i:]
+      runner.spawn_clones()
+      moved = runner.move(direction)
+      if not moved:
+        # If we gave a command that didn't result in a move, we consider the
+        # runner dead and remove it.
+        self._crashed.append(self._runners[i])
+        del self._runners[i]
+        continue
+      i += 1
+
+      if runner.position == self.maze.end:
+        return runner, []
+    return None, []
+
+  def _decide(self,
+              algorithm: Algorithm,
+              runners: List[_RunnerImpl]) -> List[Direction]:
+    """
+    Asks the algorithm where each of the runners of a round should go, either
+    awaiting an async algorithm or using the executor.
+    """
+    if self._awaits(algorithm):
+      if self._loop is None:
+        import asyncio
+        self._loop = asyncio.new_event_loop()
+      return self._loop.run_until_complete(
+          self._decide_async(algorithm, runners))
+
+    # Handing each worker its share of the runners in one go means the
+    #  visited cells are only pickled once per worker, not once per runner.
+    chunksize = -(-len(runners) // (os.cpu_count() or 1))
+    decisions = list(self._executor.map(_decide_in_worker, repeat(algorithm),
+                                        runners, chunksize=chunksize))
+    missing = [i for i, decision in enumerate(decisions) if decision is None]
+    if missing:
+      # Worker processes that didn't have this maze (as it is now) yet, are
+      #  sent it along with the runners they couldn't decide for, and keep it.
+      retried = self._executor.map(_decide_in_worker, repeat(algorithm),
+                                   [runners[i] for i in missing],
+                                   repeat(self.maze), chunksize=chunksize)
+      for i, decision in zip(missing, retried):
+        decisions[i] = decision
+
+    directions: List[Direction] = []
+    for runner, (direction, clone_requests) in zip(runners, decisions):
+      # With a process pool the algorithm saw a copy of the runner, so the
+      #  clones it asked for have to be handed back to the real one.
+      runner._clone_requests = clone_requests
+      directions.append(direction)
+    return directions
+
+  async def _decide_async(self,
+                          algorithm: Algorithm,
+                          runners: List[_RunnerImpl]) -> List[Direction]:
+    import asyncio
+    limit = asyncio.Semaphore(self._max_concurrency or len(runners))
+
+    async def decide(runner: _RunnerImpl) -> Direction:
+      async with limit:
+        try:
+          return await asyncio.wait_for(algorithm(runner),
+                                        self._decision_timeout)
+        except asyncio.TimeoutError:
+          # A decision that never came has no say in anything, including the
+          #  clones it asked for before running out of time.
+          runner._clone_requests = []
+          return AbsoluteDirection.NONE
+
+    return await asyncio.gather(*[decide(runner) for runner in runners])
+
+  def _apply(self,
+             runners: List[_RunnerImpl],
+             directions: List[Direction]
+             ) -> Tuple[Optional[_RunnerImpl], List[_RunnerImpl]]:
+    """
+    Moves the runners in order, bringing their clones into the maze first.
+    Returns the winner (if any) and the newly cloned runners.
+    """
+    spawned: List[_RunnerImpl] = []
+    for runner, direction in zip(runners, directions):
+      spawned.extend(runner.spawn_clones())
+      if not runner.move(direction):
+        # If we gave a command that didn't result in a move, we consider the
+        # runner dead and remove it.
+        self._runners.remove(runner)
+        self._crashed.append(runner)
+      elif runner.position == self.maze.end:
+        return runner, spawned
+    return None, spawned
+
+  def __getstate__(self):
+    # Runners sent to a process pool take their MazeRunner along, but only need
+    #  the visited cells from it. The maze goes by its revision, worker
+    #  processes are only sent the maze itself once (see _decide()).
+    state = self.__dict__.copy()
+    for unpicklable in ('_executor', '_loop', '_awaited_algorithm', '_runners',
+                        '_crashed'):
+      state.pop(unpicklable, None)
+    del state['_maze']
+    state['_maze_revision'] = self.maze.revision()
+    return state
+
+  def __setstate__(self, state):
+    revision = state.pop('_maze_revision')
+    self.__dict__.update(state)
+    self._runners = []
+    self._crashed = []
+    maze = _worker_mazes.get(revision[0])
+    self._maze = maze if maze and maze.revision() == revision else None
+
+  def _run(self, screen, algorithm: Algorithm):
+    curses = _curses()
     screen.clear()
     screen.refresh()
 
@@ -140,8 +536,10 @@ class MazeRunner:
     curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)
     curses.init_pair(3, curses.COLOR_BLACK, curses.COLOR_CYAN)
 
-    # No need to regenerate the maze every time, it never changes. Figure out
-    # the max dimensions and allocate a curses pad for drawing the maze
+    # The maze keeps its own text up to date (walls may be opened or closed
+    # between steps), so it is cheap to ask for every frame. Its size never
+    # changes, so figure out the max dimensions and allocate a curses pad for
+    # drawing the maze
     maze_lines: str = str(self.maze)
     maze_char_h: int = len(maze_lines.split('\n')) + 1
     maze_char_w: int = max([len(x) for x in maze_lines.split('\n')])
@@ -169,7 +567,7 @@ class MazeRunner:
 
       # Draw the maze and runners
       maze_screen.clear()
-      maze_screen.addstr(0, 0, maze_lines)
+      maze_screen.addstr(0, 0, str(self.maze))
       for runner in self._runners:
         p: Point = runner.char_position()
         maze_screen.addstr(p.y, p.x, runner.display())
@@ -210,26 +608,7 @@ class MazeRunner:
       # Use the given algorithm to advance the paths
       loop_count += 1
       start_time = time.time()
-      i: int = 0
-      while i < len(self._runners):
-        # Since the algorithm can ask a runner to duplicate itself, we need
-        # to iterate until we hit the end of the list, even if the size of
-        # the list is growing during the iteration.
-        runner = self._runners[i]
-
-        direction = algorithm(runner)
-        moved = runner.move(direction)
-        if not moved:
-          # If we gave a command that didn't result in a move, we consider the
-          # runner dead and remove it.
-          self._crashed.append(self._runners[i])
-          del self._runners[i]
-          continue
-        i += 1
-
-        if runner.position == self.maze.end:
-            winner = runner
-            break
+      winner = self._step(algorithm)
       end_time = time.time()
       elapsed = end_time - start_time
       total_time += elapsed
@@ -239,25 +618,35 @@ class MazeRunner:
 
 class _RunnerImpl(Runner):
   """Data for a person running the maze"""
-  position: Point
+  _cell: int
   _name: str = 'Runner0000'
   _parent: MazeRunner
   _heading: AbsoluteDirection
-  _history: List[Point]
+  # Cell ids of the past positions, turned into Points only when asked for
+  _history: array
+  _clone_requests: List[Tuple[Direction, str]]
   _born_at_index: int = None
 
   def __init__(self, parent: MazeRunner, position: Point, screen):
-    self.position = position
-    self._history = []
+    self._cell = parent.maze.cell_id(position)
+    self._history = array('l')
+    self._clone_requests = []
     self.screen = screen
     # We always start on the left edge, so we know we're going right to start
     self._heading = AbsoluteDirection.RIGHT
     self._parent = parent
+    parent.mark_visited(self._cell)
+
+  @property
+  def position(self) -> Point:
+    return self._parent.maze.point(self._cell)
 
   def history(self) -> List[Point]:
-    # It is important that list + list returns a copy so that the caller doesn't
+    # It is important that this returns a new list so that the caller doesn't
     #  mistakenly rewrite the past, causing a paradox that could end existence!
-    return self._history + [self.position]
+    history = list(map(self._parent.maze.point, self._history))
+    history.append(self.position)
+    return history
 
   def absolute_history(self) -> List[AbsoluteDirection]:
     past_points = self.history()
@@ -276,9 +665,11 @@ class _RunnerImpl(Runner):
     return self._name
 
   def born_at(self) -> Point:
-    return ((self.history())[self._born_at_index]
-            if self._born_at_index is not None
-            else None)
+    if self._born_at_index is None:
+      return None
+    if self._born_at_index < len(self._history):
+      return self._parent.maze.point(self._history[self._born_at_index])
+    return self.position
 
   def age(self) -> int:
     return len(self._history) - (self._born_at_index
@@ -286,24 +677,40 @@ class _RunnerImpl(Runner):
                                  else -1)
 
   def clone(self, direction: Direction, name: str = None) -> None:
-    self._parent.clone_runner(self, direction, name)
+    # Clones are only brought into the maze once every decision for the step is
+    #  in, so that the order they show up in doesn't depend on which decision
+    #  happened to finish first.
+    self._clone_requests.append((direction, name))
+
+  def spawn_clones(self) -> List[_RunnerImpl]:
+    requests, self._clone_requests = self._clone_requests, []
+    return [self._parent.clone_runner(self, direction, name)
+            for direction, name in requests]
 
   def duplicate(self, direction: Direction, name: str = None) -> _RunnerImpl:
-    global _clone_num
     if name is None:
-      _clone_num += 1
-      name = f'Runner{_clone_num:04d}'
+      name = self._parent.next_clone_name()
 
     c = _RunnerImpl(self._parent, self.position, None)
     c._born_at_index = len(self._history)
-    c._history = list(self._history)
+    c._history = self._history[:]
     c._name = name
     c._heading = self._to_absolue(direction)
     return c
 
   def can_move(self, direction: Direction) -> bool:
     abs_direction: AbsoluteDirection = self._to_absolue(direction)
-    return self._parent.maze.can_move(self.position, abs_direction)
+    return self._parent.maze.can_step(self._cell, abs_direction)
+
+  def visited(self, direction: Direction) -> bool:
+    abs_direction: AbsoluteDirection = self._to_absolue(direction)
+    if abs_direction == AbsoluteDirection.NONE:
+      return False
+    return self._parent.cell_visited(
+        self._parent.maze.step(self._cell, abs_direction))
+
+  def visit_count(self) -> int:
+    return self._parent.visit_count()
 
   def heading(self) -> AbsoluteDirection:
     return self._heading
@@ -321,6 +728,7 @@ class _RunnerImpl(Runner):
     return RelativeDirection.NONE
 
   def ask_absolute(self) -> AbsoluteDirection:
+    curses = _curses()
     c = self.screen.getch()
     direction = None
     while direction is None:
@@ -343,8 +751,9 @@ class _RunnerImpl(Runner):
     abs_direction: AbsoluteDirection = self._to_absolue(direction)
     self._heading = abs_direction
     if abs_direction != AbsoluteDirection.NONE and self.can_move(abs_direction):
-      self._history.append(self.position)
-      self.position = Maze.move(self.position, abs_direction)
+      self._history.append(self._cell)
+      self._cell = self._parent.maze.step(self._cell, abs_direction)
+      self._parent.mark_visited(self._cell)
       return True
     return False
 
@@ -366,5 +775,43 @@ class _RunnerImpl(Runner):
   def display(self) -> str:
     return str(self.heading())
 
-
-_clone_num = 0
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    state['screen'] = None
+    return state
+
+
+# The mazes a worker process has been sent, by the first part of their
+#  revision. Only the last few are kept.
+_worker_mazes: Dict[int, Maze] = {}
+_WORKER_MAZES_KEPT = 4
+
+
+def _decide_in_worker(algorithm: Algorithm,
+                      runner: _RunnerImpl,
+                      maze: Maze = None
+                      ) -> Optional[Tuple[Direction,
+                                          List[Tuple[Direction, str]]]]:
+  """
+  Asks the algorithm about a single runner on behalf of an executor. Returns the
+  direction along with the clones the runner asked for while deciding, or None
+  if the runner came without a maze, and the worker doesn't have it either.
+  """
+  parent = runner._parent
+  if parent._maze is None:
+    if maze is None:
+      return None
+    _worker_mazes.pop(maze.revision()[0], None)
+    _worker_mazes[maze.revision()[0]] = maze
+    while len(_worker_mazes) > _WORKER_MAZES_KEPT:
+      del _worker_mazes[next(iter(_worker_mazes))]
+    parent._maze = maze
+  direction = algorithm(runner)
+  if inspect.isawaitable(direction):
+    if inspect.iscoroutine(direction):
+      direction.close()
+    raise TypeError(f'The algorithm returned {direction!r}, which an executor'
+                    f' can\'t await. An async def function (or an object with'
+                    f' an async __call__) is awaited instead of using one.')
+  clone_requests, runner._clone_requests = runner._clone_requests, []
+  return direction, clone_requests
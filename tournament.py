@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from maze import Maze
+from mazerunner import Algorithm, MazeRunner
+
+# Makes a fresh Algorithm for each race, so algorithms that remember things
+#  between steps (like AlgorithmWithAPast) start every maze with a clean slate.
+AlgorithmFactory = Callable[[], Algorithm]
+
+
+@dataclass
+class Result:
+  """How a single algorithm did on a single maze"""
+  algorithm: str
+  maze_seed: int
+  # The race settings, so a checkpoint is only reused for the same ones
+  width: int
+  height: int
+  max_steps: Optional[int]
+  won: bool
+  steps: int
+  # Seconds spent on the race, see MazeRunner.elapsed(). Races share the event
+  #  loop, so with async algorithms this includes time used by other races.
+  wall_time: float
+  runners_spawned: int
+  error: Optional[str] = None
+
+
+@dataclass
+class Standing:
+  """An algorithm's place on the leaderboard, summed over all of its mazes"""
+  algorithm: str
+  wins: int
+  steps_to_win: int
+  wall_time: float
+  runners_spawned: int
+
+
+class Tournament:
+  """
+  Races many algorithms against the same seeded mazes.
+
+  Every maze is generated once and shared (read only) by all races on it. The
+  races are interleaved on a single event loop, one step at a time, and every
+  finished race is appended to the checkpoint file (if given). Running a
+  tournament again with the same checkpoint skips the races already in it, so
+  a tournament that was killed picks up where it stopped. Results recorded
+  with a different maze size or max_steps are ignored, and those races are run
+  again.
+
+  With an export directory, the mazes and runs are written there as arrays and
+  images as the races finish (see export.export_run, needs numpy). At the end
+  they are combined into one runs.npz, including the runs of earlier sessions
+  on the same checkpoint, as long as those had the same export directory.
+  """
+  _width: int
+  _height: int
+  _seeds: List[int]
+  _algorithms: Dict[str, AlgorithmFactory]
+  _max_steps: Optional[int]
+  _max_parallel: Optional[int]
+  _checkpoint: Optional[str]
+  _mazes: Dict[int, Maze]
+  _export_dir: Optional[str]
+
+  def __init__(self,
+               width: int,
+               height: int,
+               seeds: Iterable[int],
+               algorithms: Dict[str, AlgorithmFactory],
+               max_steps: int = None,
+               max_parallel: int = None,
+               checkpoint: str = None,
+               export_dir: str = None):
+    """
+    max_steps ends (and loses) a race that goes on for too long, and
+    max_parallel limits how many races are in progress at once.
+    """
+    self._width = width
+    self._height = height
+    self._seeds = list(seeds)
+    self._algorithms = algorithms
+    self._max_steps = max_steps
+    self._max_parallel = max_parallel
+    self._checkpoint = checkpoint
+    self._mazes = {}
+    self._export_dir = export_dir
+
+  def maze(self, seed: int) -> Maze:
+    """The maze for the given seed, the same one MazeRunner would create"""
+    if seed not in self._mazes:
+      r = random.Random()
+      r.seed(seed, version=1)
+      self._mazes[seed] = Maze(self._width, self._height, r)
+    return self._mazes[seed]
+
+  def run(self) -> List[Result]:
+    """Runs every race not already in the checkpoint, returning all results"""
+    return asyncio.run(self.run_async())
+
+  async def run_async(self) -> List[Result]:
+    results = self._load_checkpoint()
+    done: Set[Tuple[str, int]] = {(r.algorithm, r.maze_seed) for r in results}
+    races = [(name, seed) for seed in self._seeds for name in self._algorithms
+             if (name, seed) not in done]
+    limit = asyncio.Semaphore(self._max_parallel or max(len(races), 1))
+
+    async def race(name: str, seed: int) -> None:
+      async with limit:
+        result = await self._race(name, seed)
+      results.append(result)
+      self._save_checkpoint(result)
+
+    await asyncio.gather(*[race(name, seed) for name, seed in races])
+    if self._export_dir:
+      from export import combine_runs
+      combine_runs(self._export_dir,
+                   [f'{r.algorithm}-{r.maze_seed}' for r in results])
+    return results
+
+  async def _race(self, name: str, seed: int) -> Result:
+    runner = MazeRunner(self._width, self._height, maze_seed=seed,
+                        delay_time=0, maze=self.maze(seed))
+    error = None
+    try:
+      winner = await runner.run_headless_async(self._algorithms[name](),
+                                               self._max_steps)
+    except Exception as e:
+      # One misbehaving algorithm shouldn't bring down the whole tournament,
+      #  it just doesn't win this race.
+      winner = None
+      error = f'{type(e).__name__}: {e}'
+    if self._export_dir:
+      # Before the result is checkpointed, so a race in the checkpoint has its
+      #  run exported too.
+      from export import export_run
+      export_run(self._export_dir, f'{name}-{seed}', seed, runner)
+    return Result(algorithm=name,
+                  maze_seed=seed,
+                  width=self._width,
+                  height=self._height,
+                  max_steps=self._max_steps,
+                  won=winner is not None,
+                  steps=runner.steps(),
+                  wall_time=runner.elapsed(),
+                  runners_spawned=runner.runner_count(),
+                  error=error)
+
+  def _load_checkpoint(self) -> List[Result]:
+    if not self._checkpoint or not os.path.exists(self._checkpoint):
+      return []
+    with open(self._checkpoint) as f:
+      text = f.read()
+    if text and not text.endswith('\n'):
+      # The tournament was killed halfway through writing a result. Finish the
+      #  line so the next result doesn't end up glued to it.
+      with open(self._checkpoint, 'a') as f:
+        f.write('\n')
+    results: List[Result] = []
+    for line in text.splitlines():
+      try:
+        result = Result(**json.loads(line))
+      except (ValueError, TypeError):
+        # A result cut short like that is skipped, and the race is run again.
+        continue
+      if ((result.width, result.height, result.max_steps)
+          == (self._width, self._height, self._max_steps)):
+        results.append(result)
+    return results
+
+  def _save_checkpoint(self, result: Result) -> None:
+    if not self._checkpoint:
+      return
+    with open(self._checkpoint, 'a') as f:
+      f.write(json.dumps(asdict(result)) + '\n')
+
+
+def ranked(results: Iterable[Result]) -> List[Standing]:
+  """
+  Sums up the results per algorithm, best first: most wins, then fewest steps
+  taken in the races won. Time isn't ranked on, since it depends on what else
+  was running alongside.
+  """
+  standings: Dict[str, Standing] = {}
+  for r in results:
+    s = standings.setdefault(r.algorithm, Standing(r.algorithm, 0, 0, 0, 0))
+    if r.won:
+      s.wins += 1
+      s.steps_to_win += r.steps
+    s.wall_time += r.wall_time
+    s.runners_spawned += r.runners_spawned
+  return sorted(standings.values(),
+                key=lambda s: (-s.wins, s.steps_to_win))